@@ -1,7 +1,14 @@
 from google.colab import userdata
+import atexit
+import functools
+import importlib.util
+import os
+import re
 import pandas as pd
 import numpy as np
+import httpx
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from typing import TypedDict, List
 
 # Import LangGraph and related components
@@ -9,6 +16,7 @@ from langgraph.graph import END, StateGraph
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.embeddings import HuggingFaceEmbeddings
 # from langchain_groq import ChatGroq
 from langchain.chat_models import AzureChatOpenAI
@@ -18,57 +26,69 @@ azure_api_key = userdata.get("azure_api_key")
 azure_endpoint = userdata.get("azure_endpoint")
 deployment_name = "gpt-4-32k"
 
+# Same keep-alive client as llm_client.py; this script runs standalone in Colab.
+http_client = httpx.Client(
+    http2=importlib.util.find_spec("h2") is not None,
+    timeout=60,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
 llm = AzureChatOpenAI(
     deployment_name=deployment_name,
     openai_api_key=azure_api_key,
     openai_api_base=azure_endpoint,
     openai_api_version = "2024-08-01-preview",
     model_name="gpt-4-32k",
-    temperature=0.3
+    temperature=0.3,
+    http_client=http_client
 )
 
-# defining a similarity function
-def cosine_similarity(vec1: np.ndarray, vec2:np.ndarray)->float:
-  return float(np.dot(vec1, vec2)/(np.linalg.norm(vec1))*(np.linalg.norm(vec2)))
-
-def get_embedding(text:str) -> np.ndarray:
-  return np.array(embeddings.embed_query(text))
-
-def is_similar(query:str, document: Document, threshold:float = 0.5)->bool:
-  query_emb = get_embedding(query)
-  doc_emb = get_embedding(document.page_content)
-  sim = cosine_similarity(query_emb, doc_emb)
-  logging.info("Cosine Similarity: %d", sim)
-  return sim >= threshold
+# LLM calls are network-bound; independent ones are issued concurrently on this pool.
+executor = ThreadPoolExecutor(max_workers=4)
 
 # Setup Logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 # Data Loading and Document Preparation
+TEST_CASES_CSV = "/content/test_cases.csv"
+REQUIRED_COLUMNS = ["Module", "Test_Scenario", "Test_Steps", "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"]
+FLUSH_EVERY = 20  # buffered test cases written to the CSV per append
 df = pd.read_csv("/content/defects.csv")
 
 try:
-    test_cases_df = pd.read_csv("/content/test_cases.csv")
+    test_cases_df = pd.read_csv(TEST_CASES_CSV)
 except Exception as e:
     logging.warning("Test cases file not found or unreadable. Creating an empty DataFrame.")
-    test_cases_df = pd.DataFrame(columns=["Module", "Test_Scenario", "Test_Steps", "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"])
-
-# Build documents from defects CSV (only using Module, Description, Solution)
-docs = []
-for _, row in df.iterrows():
-    if pd.notna(row["Description"]) and pd.notna(row["Solution"]):
-        docs.append(Document(
-            page_content=row["Description"],
-            metadata={
-                "solution": row["Solution"],
-                "module": row["Module"]
-            }
-        ))
+    test_cases_df = pd.DataFrame(columns=REQUIRED_COLUMNS)
+
+# test_cases_df stays as loaded; test cases generated during this run live in the
+# append-only _new_rows list, of which the first _flushed rows are already in the CSV.
+_new_rows: List[dict] = []
+_flushed = 0
+_existing_keys = set(map(tuple, test_cases_df[REQUIRED_COLUMNS].to_numpy()))
+
+# Build documents from defects CSV (only using Module, Description, Solution; one per unique description)
+mask = df["Description"].notna() & df["Solution"].notna()
+docs = [
+    Document(page_content=row.Description, metadata={"solution": row.Solution, "module": row.Module})
+    for row in df.loc[mask, ["Description", "Solution", "Module"]].drop_duplicates("Description").itertuples(index=False)
+]
+
+# Create embeddings and FAISS vector store for retrieval.
+# Embeddings are L2-normalized and searched by inner product, so FAISS scores are cosine similarities.
+embeddings = HuggingFaceEmbeddings(
+    model_name="sentence-transformers/all-MiniLM-L6-v2",
+    encode_kwargs={"normalize_embeddings": True, "batch_size": 64}
+)
+vector_store = FAISS.from_documents(docs, embeddings, distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT)
 
-# Create embeddings and FAISS vector store for retrieval
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vector_store = FAISS.from_documents(docs, embeddings)
-retriever = vector_store.as_retriever(search_kwargs={"k": 1})
+# Query embeddings are cached so repeated errors (and retries) skip the MiniLM forward pass.
+@functools.lru_cache(maxsize=1024)
+def get_embedding(text: str) -> np.ndarray:
+    # MiniLM outputs float32 and FAISS searches float32; avoid the float64 default.
+    embedding = np.asarray(embeddings.embed_query(text), dtype=np.float32)
+    embedding.setflags(write=False)  # the cached array is shared between callers
+    return embedding
 
 # Helper: Retrieve CSV Test Cases by Module (only return proper ones)
 def get_csv_test_cases(module: str) -> List[dict]:
@@ -79,78 +99,174 @@ def get_csv_test_cases(module: str) -> List[dict]:
       Module, Test_Scenario, Test_Steps, Pre_Requisite, Pass_Fail_Criteria, Expected_Result.
     """
     valid_cases = []
-    global test_cases_df
-    if test_cases_df.empty:
-        return valid_cases
-
-    df_filtered = test_cases_df[test_cases_df["Module"] == module]
-    required_fields = ["Test_Scenario", "Test_Steps", "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"]
-    for _, row in df_filtered.iterrows():
-        if all(str(row.get(field, "")).strip() for field in required_fields):
-            tc_dict = {field: row[field] for field in required_fields}
-            tc_dict["Module"] = row["Module"]
-            valid_cases.append(tc_dict)
+    required_fields = REQUIRED_COLUMNS[1:]
+    if not test_cases_df.empty:
+        df_filtered = test_cases_df.loc[test_cases_df["Module"].values == module, REQUIRED_COLUMNS]
+        stripped = df_filtered[required_fields].astype(str).apply(lambda col: col.str.strip())
+        df_filtered = df_filtered[(stripped != "").all(axis=1)]
+        valid_cases.extend(row._asdict() for row in df_filtered.itertuples(index=False))
+    # Include test cases generated earlier in this run.
+    valid_cases.extend(
+        case for case in _new_rows
+        if case["Module"] == module and all(str(case[field]).strip() for field in required_fields)
+    )
     return valid_cases
 
 # Helper: Parse Generated Test Case into Fields
+TEST_CASE_FIELDS = ["Test_Scenario", "Test_Steps", "Pre_Requisite", "Expected_Result", "Pass_Fail_Criteria"]
+_LABELS = "|".join(TEST_CASE_FIELDS)
+_FIELD_RE = re.compile(rf"({_LABELS}):\s*(.*?)\s*(?=(?:{_LABELS}):|\Z)", re.DOTALL)
+
 def parse_test_case(tc_text: str) -> dict:
     """
     Parses a generated test case text to extract the fields.
     Expected labels: Test_Scenario:, Test_Steps:, Pre_Requisite:, Expected_Result:, Pass_Fail_Criteria:
     """
-    fields = {
-        "Test_Scenario": "",
-        "Test_Steps": "",
-        "Pre_Requisite": "",
-        "Expected_Result": "",
-        "Pass_Fail_Criteria": ""
-    }
-    # Use regex to capture content after each label up to the next label or end.
-    for field in fields.keys():
-        pattern = field + r":\s*(.*?)\s*(?=(Test_Steps:|Pre_Requisite:|Expected_Result:|Pass_Fail_Criteria:|$))"
-        match = re.search(pattern, tc_text, re.DOTALL)
-        if match:
-            fields[field] = match.group(1).strip()
+    fields = dict.fromkeys(TEST_CASE_FIELDS, "")
+    # Single pass: capture content after each label up to the next label or end.
+    for match in _FIELD_RE.finditer(tc_text):
+        label, value = match.groups()
+        if not fields[label]:
+            fields[label] = value.strip()
     return fields
 
-# Helper: Save New Test Cases to CSV (avoiding duplicates)
-def save_new_test_cases(new_cases: List[dict]):
+# Helper: Stream Generated Test Cases, parsing each one as soon as its delimiter arrives
+TEST_CASE_DELIMITER = "### END TEST CASE ###"
+
+def stream_test_cases(messages, module: str):
+    def to_case(tc_raw: str):
+        parsed = parse_test_case(tc_raw.strip())
+        if parsed["Test_Scenario"]:
+            return {
+                "Module": module,
+                "Test_Scenario": parsed["Test_Scenario"],
+                "Test_Steps": parsed["Test_Steps"],
+                "Pre_Requisite": parsed["Pre_Requisite"],
+                "Pass_Fail_Criteria": parsed["Pass_Fail_Criteria"],
+                "Expected_Result": parsed["Expected_Result"]
+            }
+
+    buffer = ""
+    for chunk in llm.stream(messages):
+        buffer += chunk.content
+        # Everything before the last delimiter is complete; keep only the partial tail.
+        *complete, buffer = buffer.split(TEST_CASE_DELIMITER)
+        for tc_raw in complete:
+            case = to_case(tc_raw)
+            if case:
+                yield case
+    # A final test case may arrive without its delimiter.
+    case = to_case(buffer)
+    if case:
+        yield case
+
+# Helper: Queue one generated test case for the CSV (avoiding duplicates)
+def queue_test_case(case: dict) -> bool:
     """
-    new_cases: list of dictionaries with keys:
+    case: dictionary with keys:
       Module, Test_Scenario, Test_Steps, Pre_Requisite, Pass_Fail_Criteria, Expected_Result.
-    Appends only new (non-duplicate) test cases to the CSV.
+    Buffers the test case if it is new and appends the buffer to the CSV every FLUSH_EVERY rows.
+    Returns False for duplicates.
     """
-    global test_cases_df
-    required_columns = ["Module", "Test_Scenario", "Test_Steps", "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"]
-    if test_cases_df.empty:
-        test_cases_df = pd.DataFrame(columns=required_columns)
-    
-    rows_to_add = []
-    for case in new_cases:
-        duplicate = test_cases_df[
-            (test_cases_df["Module"] == case["Module"]) &
-            (test_cases_df["Test_Scenario"] == case["Test_Scenario"]) &
-            (test_cases_df["Test_Steps"] == case["Test_Steps"]) &
-            (test_cases_df["Pre_Requisite"] == case["Pre_Requisite"]) &
-            (test_cases_df["Pass_Fail_Criteria"] == case["Pass_Fail_Criteria"]) &
-            (test_cases_df["Expected_Result"] == case["Expected_Result"])
-        ]
-        if duplicate.empty:
-            rows_to_add.append(case)
-    if rows_to_add:
-        new_df = pd.DataFrame(rows_to_add)
-        test_cases_df = pd.concat([test_cases_df, new_df], ignore_index=True)
-        test_cases_df.to_csv("/content/test_cases.csv", index=False)
-        logging.info("Saved %d new test case(s) to CSV.", len(rows_to_add))
-    else:
-        logging.info("No new test cases to save (duplicates skipped).")
+    key = tuple(case[col] for col in REQUIRED_COLUMNS)
+    if key in _existing_keys:
+        return False
+    _existing_keys.add(key)
+    _new_rows.append(case)
+    if len(_new_rows) - _flushed >= FLUSH_EVERY:
+        flush_new_test_cases()
+    return True
+
+# Helper: Append buffered test cases to the CSV
+def flush_new_test_cases():
+    global _flushed
+    pending = _new_rows[_flushed:]
+    if not pending:
+        return
+    # Write the header only when the file is new or empty; otherwise follow the file's column order.
+    write_header = not os.path.exists(TEST_CASES_CSV) or os.path.getsize(TEST_CASES_CSV) == 0
+    columns = REQUIRED_COLUMNS if write_header else list(test_cases_df.columns)
+    pd.DataFrame(pending, columns=columns).to_csv(TEST_CASES_CSV, mode="a", header=write_header, index=False)
+    _flushed = len(_new_rows)
+    logging.info("Saved %d new test case(s) to CSV.", len(pending))
+
+atexit.register(flush_new_test_cases)
+
+# Prompt Templates (parsed once at import rather than on every request)
+EXPLANATION_TEMPLATE = ChatPromptTemplate.from_template("""
+    [INST] Explain why this solution fixes the following error:
+    Error: {error}
+    Solution: {solution}
+    [/INST]
+    """)
+
+ADDITIONAL_TEST_CASES_TEMPLATE = ChatPromptTemplate.from_template("""
+    [INST] Generate {num} additional comprehensive test case(s) to fully validate the following defect solution end-to-end.
+    Error: {error}
+    Solution: {solution}
+    Ensure that these test cases do not duplicate the following existing test cases:
+    {existing_test_cases}
+    Each test case MUST include:
+    Test_Scenario:
+    Test_Steps:
+    Pre_Requisite:
+    Expected_Result:
+    Pass_Fail_Criteria:
+    End each test case with the delimiter "### END TEST CASE ###".
+    [/INST]
+    """)
+
+FULL_TEST_CASES_TEMPLATE = ChatPromptTemplate.from_template("""
+    [INST] Generate a comprehensive set of test cases to fully validate the following defect solution end-to-end.
+    Error: {error}
+    Solution: {solution}
+    Each test case MUST include:
+    Test_Scenario:
+    Test_Steps:
+    Pre_Requisite:
+    Expected_Result:
+    Pass_Fail_Criteria:
+    End each test case with the delimiter "### END TEST CASE ###".
+    [/INST]
+    """)
+
+ALTERNATIVE_SOLUTION_TEMPLATE = ChatPromptTemplate.from_template("""
+    [INST] Provide a concise, actionable alternative solution for the following error:
+    Error: {error}
+    Ensure that the solution is clear and does not include any follow-up questions.
+    [/INST]
+    """)
+
+ALTERNATIVE_TEST_CASES_TEMPLATE = ChatPromptTemplate.from_template("""
+    [INST] Given the error and the alternative solution:
+    Error: {error}
+    Solution: {solution}
+    Generate EXACTLY 4 structured test cases with the delimiter "### END TEST CASE ###" after each test case.
+    Each test case must include:
+      Test_Scenario:
+      Test_Steps:
+      Pre_Requisite:
+      Expected_Result:
+      Pass_Fail_Criteria:
+    [/INST]
+    """)
 
 # Define Agent State and LLM Initialization
 class AgentState(TypedDict):
     input: str
     context: List[Document]
+    score: float
     response: str
 
+# Workflow Node: Retrieve the closest defect together with its cosine similarity score
+def retrieve(state: AgentState):
+    docs_and_scores = vector_store.similarity_search_with_score_by_vector(get_embedding(state["input"]), k=1)
+    if not docs_and_scores:
+        return {"context": [], "score": 0.0}
+    doc, score = docs_and_scores[0]
+    logging.info("Cosine Similarity: %.3f", score)
+    return {"context": [doc], "score": float(score)}
+
 # Workflow Node: Validate or Generate Test Cases (with CSV storage and supplementing missing cases)
 def validate_or_generate_test_cases(state: AgentState):
     try:
@@ -160,8 +276,8 @@ def validate_or_generate_test_cases(state: AgentState):
         error_message = state["input"]
 
         # Ensure the defect is similar to the error message
-        if not is_similar(error_message, context, threshold = 0.6):
-          return {"response":"**Error**: The defect could not be found in the database."}
+        if state["score"] < 0.6:
+            return {"response":"**Error**: The defect could not be found in the database."}
 
         # if similarity(error_message.lower(), context.page_content.lower()) <= 0.5:
         #     return {"response": "**Error**: The defect could not be found in the database."}
@@ -170,15 +286,9 @@ def validate_or_generate_test_cases(state: AgentState):
         module = context.metadata["module"]
 
         # Generate explanation for why the solution works
-        explanation_prompt = """
-        [INST] Explain why this solution fixes the following error:
-        Error: {error}
-        Solution: {solution}
-        [/INST]
-        """
-        explanation_template = ChatPromptTemplate.from_template(explanation_prompt)
-        formatted_explanation = explanation_template.format_prompt(error=error_message, solution=solution)
-        explanation = llm.invoke(formatted_explanation.to_messages()).content.strip()
+        formatted_explanation = EXPLANATION_TEMPLATE.format_prompt(error=error_message, solution=solution)
+        # The test case prompts below do not depend on the explanation, so it is generated concurrently.
+        explanation_future = executor.submit(llm.invoke, formatted_explanation.to_messages())
 
         # Fetch test cases from CSV for the module
         csv_test_cases = get_csv_test_cases(module)
@@ -191,90 +301,34 @@ def validate_or_generate_test_cases(state: AgentState):
         elif csv_test_cases and len(csv_test_cases) < REQUIRED_TEST_CASE_COUNT:
             # If some proper test cases exist but not enough, generate the missing ones.
             num_to_generate = REQUIRED_TEST_CASE_COUNT - len(csv_test_cases)
-            additional_prompt = """
-            [INST] Generate {num} additional comprehensive test case(s) to fully validate the following defect solution end-to-end.
-            Error: {error}
-            Solution: {solution}
-            Explanation: {explanation}
-            Ensure that these test cases do not duplicate the following existing test cases:
-            {existing_test_cases}
-            Each test case MUST include:
-            Test_Scenario:
-            Test_Steps:
-            Pre_Requisite:
-            Expected_Result:
-            Pass_Fail_Criteria:
-            End each test case with the delimiter "### END TEST CASE ###".
-            [/INST]
-            """
             existing_str = "\n".join(
                 f"Test_Scenario: {tc['Test_Scenario']}\nTest_Steps: {tc['Test_Steps']}\nPre_Requisite: {tc['Pre_Requisite']}\nExpected_Result: {tc['Expected_Result']}\nPass_Fail_Criteria: {tc['Pass_Fail_Criteria']}"
                 for tc in csv_test_cases
             )
-            additional_template = ChatPromptTemplate.from_template(additional_prompt)
-            formatted_additional = additional_template.format_prompt(
+            formatted_additional = ADDITIONAL_TEST_CASES_TEMPLATE.format_prompt(
                 num=num_to_generate,
                 error=error_message,
                 solution=solution,
-                explanation=explanation,
                 existing_test_cases=existing_str
             )
-            additional_response = llm.invoke(formatted_additional.to_messages()).content.strip()
-            delimiter = "\n### END TEST CASE ###\n"
-            additional_cases_raw = [tc.strip() for tc in re.split(delimiter, additional_response) if tc.strip()]
             additional_cases = []
-            for tc_raw in additional_cases_raw:
-                parsed = parse_test_case(tc_raw)
-                if parsed["Test_Scenario"]:
-                    additional_cases.append({
-                        "Module": module,
-                        "Test_Scenario": parsed["Test_Scenario"],
-                        "Test_Steps": parsed["Test_Steps"],
-                        "Pre_Requisite": parsed["Pre_Requisite"],
-                        "Pass_Fail_Criteria": parsed["Pass_Fail_Criteria"],
-                        "Expected_Result": parsed["Expected_Result"]
-                    })
+            # Each case is de-duplicated and queued for the CSV as soon as it streams in.
+            for case in stream_test_cases(formatted_additional.to_messages(), module):
+                additional_cases.append(case)
+                queue_test_case(case)
             selected_cases = csv_test_cases + additional_cases
-            if additional_cases:
-                save_new_test_cases(additional_cases)
             logging.info("CSV had %d test case(s); generated %d additional test case(s).", len(csv_test_cases), len(additional_cases))
         else:
             # If no proper test cases exist in CSV, generate them all.
-            full_prompt = """
-            [INST] Generate a comprehensive set of test cases to fully validate the following defect solution end-to-end.
-            Error: {error}
-            Solution: {solution}
-            Explanation: {explanation}
-            Each test case MUST include:
-            Test_Scenario:
-            Test_Steps:
-            Pre_Requisite:
-            Expected_Result:
-            Pass_Fail_Criteria:
-            End each test case with the delimiter "### END TEST CASE ###".
-            [/INST]
-            """
-            full_template = ChatPromptTemplate.from_template(full_prompt)
-            formatted_full = full_template.format_prompt(error=error_message, solution=solution, explanation=explanation)
-            full_response = llm.invoke(formatted_full.to_messages()).content.strip()
-            delimiter = "\n### END TEST CASE ###\n"
-            full_cases_raw = [tc.strip() for tc in re.split(delimiter, full_response) if tc.strip()]
+            formatted_full = FULL_TEST_CASES_TEMPLATE.format_prompt(error=error_message, solution=solution)
             selected_cases = []
-            for tc_raw in full_cases_raw:
-                parsed = parse_test_case(tc_raw)
-                if parsed["Test_Scenario"]:
-                    selected_cases.append({
-                        "Module": module,
-                        "Test_Scenario": parsed["Test_Scenario"],
-                        "Test_Steps": parsed["Test_Steps"],
-                        "Pre_Requisite": parsed["Pre_Requisite"],
-                        "Pass_Fail_Criteria": parsed["Pass_Fail_Criteria"],
-                        "Expected_Result": parsed["Expected_Result"]
-                    })
-            if selected_cases:
-                save_new_test_cases(selected_cases)
+            for case in stream_test_cases(formatted_full.to_messages(), module):
+                selected_cases.append(case)
+                queue_test_case(case)
             logging.info("No proper test cases found in CSV; generated %d test case(s) from scratch.", len(selected_cases))
 
+        explanation = explanation_future.result().content.strip()
+
         # Format the selected test cases for final output
         def format_tc(tc: dict) -> str:
             return (f"Test_Scenario: {tc['Test_Scenario']}\n"
@@ -302,7 +356,7 @@ def validate_or_generate_test_cases(state: AgentState):
 
 # Build the State Graph Workflow
 workflow = StateGraph(AgentState)
-workflow.add_node("retrieve", lambda state: {"context": retriever.invoke(state["input"])})
+workflow.add_node("retrieve", retrieve)
 workflow.add_node("validate_or_generate_test_cases", validate_or_generate_test_cases)
 workflow.set_entry_point("retrieve")
 workflow.add_edge("retrieve", "validate_or_generate_test_cases")
@@ -319,31 +373,10 @@ def auto_evaluate_solution(response: str) -> int:
         return 3
 
 def generate_alternative_solution(error_message: str) -> str:
-    alt_prompt = """
-    [INST] Provide a concise, actionable alternative solution for the following error:
-    Error: {error}
-    Ensure that the solution is clear and does not include any follow-up questions.
-    [/INST]
-    """
-    alt_template = ChatPromptTemplate.from_template(alt_prompt)
-    formatted_alt = alt_template.format_prompt(error=error_message)
+    formatted_alt = ALTERNATIVE_SOLUTION_TEMPLATE.format_prompt(error=error_message)
     alternative_solution = llm.invoke(formatted_alt.to_messages()).content.strip()
 
-    test_case_prompt = """
-    [INST] Given the error and the alternative solution:
-    Error: {error}
-    Solution: {solution}
-    Generate EXACTLY 4 structured test cases with the delimiter "### END TEST CASE ###" after each test case.
-    Each test case must include:
-      Test_Scenario:
-      Test_Steps:
-      Pre_Requisite:
-      Expected_Result:
-      Pass_Fail_Criteria:
-    [/INST]
-    """
-    tc_template = ChatPromptTemplate.from_template(test_case_prompt)
-    formatted_tc = tc_template.format_prompt(error=error_message, solution=alternative_solution)
+    formatted_tc = ALTERNATIVE_TEST_CASES_TEMPLATE.format_prompt(error=error_message, solution=alternative_solution)
     alternative_test_cases = llm.invoke(formatted_tc.to_messages()).content.strip()
 
     alt_response = (
@@ -361,6 +394,8 @@ def get_solution_autonomously(error_message: str) -> str:
     while iteration < max_iterations:
         logging.info("Iteration %d: Processing error: %s", iteration + 1, error_message)
         result = agent.invoke({"input": error_message.strip()})
+        # Write this request's generated test cases now rather than at kernel shutdown.
+        flush_new_test_cases()
         response = result["response"]
         logging.info("Agent response:\n%s", response)
         rating = auto_evaluate_solution(response)
@@ -376,10 +411,39 @@ def get_solution_autonomously(error_message: str) -> str:
     logging.info("Max iterations reached. Returning last response.")
     return response
 
+# Batch Processing: one embedding pass and one FAISS search for a list of errors
+def process_errors(errors: List[str]) -> List[str]:
+    errors = [error.strip() for error in errors]
+    if not errors:
+        return []
+    query_embs = np.asarray(embeddings.embed_documents(errors), dtype=np.float32)
+    scores, ids = vector_store.index.search(query_embs, 1)
+    responses = []
+    for error_message, score, doc_id in zip(errors, scores[:, 0], ids[:, 0]):
+        context = []
+        if doc_id != -1:
+            context = [vector_store.docstore.search(vector_store.index_to_docstore_id[int(doc_id)])]
+        logging.info("Processing error: %s (cosine similarity %.3f)", error_message, score)
+        response = validate_or_generate_test_cases(
+            {"input": error_message, "context": context, "score": float(score)}
+        )["response"]
+        responses.append(response)
+    low_rated = [i for i, response in enumerate(responses) if auto_evaluate_solution(response) < 3]
+    if low_rated:
+        logging.info("%d rating(s) below threshold. Generating alternative solutions.", len(low_rated))
+        # Each alternative's two calls are dependent, but separate errors are not.
+        alternatives = executor.map(generate_alternative_solution, [errors[i] for i in low_rated])
+        for i, alternative in zip(low_rated, alternatives):
+            responses[i] = alternative
+    # The Colab kernel outlives the call; don't leave this batch's test cases buffered.
+    flush_new_test_cases()
+    return responses
+
 # Autonomous Agent Execution
 def main():
     error_description = "BIOS not booting up"
     final_solution = get_solution_autonomously(error_description)
+    flush_new_test_cases()
     print("\n=== Final Autonomous Response ===\n")
     print(final_solution)
 
@@ -11,6 +11,8 @@ RECEIVER_EMAIL = os.getenv("RECEIVER_EMAIL")
 # File paths
 DEFECTS_CSV = os.getenv("DEFECTS_CSV", "defects.csv")
 TEST_CASES_CSV = os.getenv("TEST_CASES_CSV", "test_cases.csv")
+CACHE_DIR = os.getenv("CACHE_DIR", ".cache")
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", ".llm_cache.db")
 
 # LLM API key
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -1,9 +1,23 @@
 # data_loader.py
+import hashlib
+import json
+import os
+import faiss
+import numpy as np
 import pandas as pd
 from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from config import DEFECTS_CSV
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
+from config import DEFECTS_CSV, CACHE_DIR
+from utils import save_index_with_sidecar
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# Below this many documents an exact flat scan is faster than IVF+PQ.
+IVF_MIN_DOCS = 1000
 
 def load_defects():
     try:
@@ -23,19 +37,112 @@ def load_test_cases():
     return test_cases_df
 
 def build_defect_documents(defects_df):
+    if defects_df.empty:
+        return []
+    mask = defects_df["Description"].notna() & defects_df["Solution"].notna()
+    # Repeated descriptions would be embedded and indexed more than once; keep the first.
+    # An optional Explanation column is carried into metadata so known defects skip that LLM call.
+    columns = ["Description", "Solution", "Module"]
+    if "Explanation" in defects_df.columns:
+        columns.append("Explanation")
+    sub = defects_df.loc[mask, columns].drop_duplicates("Description")
     docs = []
-    for _, row in defects_df.iterrows():
-        if pd.notna(row.get("Description")) and pd.notna(row.get("Solution")):
-            docs.append(Document(
-                page_content=row["Description"],
-                metadata={
-                    "solution": row["Solution"],
-                    "module": row["Module"]
-                }
-            ))
+    for row in sub.itertuples(index=False):
+        metadata = {"solution": row.Solution, "module": row.Module}
+        explanation = getattr(row, "Explanation", None)
+        if isinstance(explanation, str) and explanation.strip():
+            metadata["explanation"] = explanation.strip()
+        docs.append(Document(page_content=row.Description, metadata=metadata))
     return docs
 
+def _create_index(vectors):
+    n, d = vectors.shape
+    if n < IVF_MIN_DOCS:
+        # Flat indexes need an id map to support add_with_ids/remove_ids.
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(d))
+    # Coarse clustering + product-quantized codes: sub-linear search, ~d*4/m smaller vectors.
+    nlist = min(64, int(np.sqrt(n) * 4))
+    m = next(m for m in (48, 32, 24, 16, 8, 4, 2, 1) if d % m == 0)
+    quantizer = faiss.IndexFlatIP(d)
+    index = faiss.IndexIVFPQ(quantizer, d, nlist, m, 8, faiss.METRIC_INNER_PRODUCT)
+    index.train(vectors)
+    index.nprobe = 8
+    return index
+
+def _doc_key(doc) -> str:
+    return hashlib.blake2b("\x1f".join([
+        doc.page_content, str(doc.metadata["solution"]), str(doc.metadata["module"])
+    ]).encode(), digest_size=16).hexdigest()
+
+def defects_fingerprint(vector_store) -> str:
+    # Changes whenever any indexed defect's description or metadata (solution, module,
+    # stored explanation) does.
+    docs = (vector_store.docstore.search(doc_id) for doc_id in vector_store.index_to_docstore_id.values())
+    rows = sorted(json.dumps([doc.page_content, doc.metadata], sort_keys=True, default=str) for doc in docs)
+    return hashlib.blake2b("\n".join(rows).encode(), digest_size=16).hexdigest()
+
+def _load_index(index_path: str, ids_path: str):
+    if not (os.path.exists(index_path) and os.path.exists(ids_path)):
+        return None, {}
+    with open(ids_path) as f:
+        sidecar = json.load(f)
+    if sidecar.get("model") != EMBEDDING_MODEL:
+        return None, {}
+    index = faiss.read_index(index_path)
+    # A crash between the two replaces in save_index_with_sidecar leaves files from different saves.
+    if index.ntotal != len(sidecar["ids"]):
+        return None, {}
+    return index, sidecar["ids"]
+
+def create_embeddings():
+    # Normalized embeddings + inner-product search: FAISS scores are cosine similarities.
+    embeddings = HuggingFaceEmbeddings(
+        model_name=EMBEDDING_MODEL,
+        encode_kwargs={"normalize_embeddings": True, "batch_size": 64}
+    )
+    # Document and query embeddings are cached on disk across runs.
+    return CacheBackedEmbeddings.from_bytes_store(
+        embeddings, LocalFileStore(os.path.join(CACHE_DIR, "emb")),
+        namespace=EMBEDDING_MODEL, query_embedding_cache=True
+    )
+
 def create_vector_store(docs):
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vector_store = FAISS.from_documents(docs, embeddings)
+    if not docs:
+        raise ValueError("No defects with a Description and Solution found to index.")
+    embeddings = create_embeddings()
+    index_path = os.path.join(CACHE_DIR, "defects.faiss")
+    ids_path = os.path.join(CACHE_DIR, "defects_ids.json")
+    keys = [_doc_key(doc) for doc in docs]
+
+    # The persisted index is updated in place: only added/removed defect rows are touched.
+    index, id_by_key = _load_index(index_path, ids_path)
+    if isinstance(index, faiss.IndexIDMap2) and len(docs) >= IVF_MIN_DOCS:
+        index, id_by_key = None, {}  # outgrew the flat index; rebuild as IVF+PQ
+
+    current = set(keys)
+    stale = [key for key in id_by_key if key not in current]
+    if stale:
+        index.remove_ids(np.array([id_by_key.pop(key) for key in stale], dtype=np.int64))
+
+    new_docs = {key: doc for key, doc in zip(keys, docs) if key not in id_by_key}
+    if new_docs:
+        # One batched forward pass over the new descriptions.
+        vectors = np.asarray(
+            embeddings.embed_documents([doc.page_content for doc in new_docs.values()]), dtype=np.float32
+        )
+        if index is None:
+            index = _create_index(vectors)
+        next_id = max(id_by_key.values(), default=-1) + 1
+        new_ids = np.arange(next_id, next_id + len(new_docs), dtype=np.int64)
+        index.add_with_ids(vectors, new_ids)
+        id_by_key.update(zip(new_docs, new_ids.tolist()))
+    if stale or new_docs:
+        save_index_with_sidecar(index, index_path, {"model": EMBEDDING_MODEL, "ids": id_by_key}, ids_path)
+
+    docstore = InMemoryDocstore({str(id_by_key[key]): doc for key, doc in zip(keys, docs)})
+    index_to_docstore_id = {id_by_key[key]: str(id_by_key[key]) for key in keys}
+    vector_store = FAISS(
+        embeddings, index, docstore, index_to_docstore_id,
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT
+    )
     return vector_store
@@ -1,68 +1,107 @@
 # llm_client.py
+import functools
+import hashlib
+import importlib.util
+import re
+import threading
+from collections import OrderedDict
+import httpx
 from langchain_groq import ChatGroq
+from langchain_community.cache import SQLiteCache
+from langchain_core.globals import set_llm_cache
 from langchain_core.prompts import ChatPromptTemplate
-from config import GROQ_API_KEY
+from config import GROQ_API_KEY, LLM_CACHE_DB
 
 # Initialize the LLM using the API key from .env
 if not GROQ_API_KEY:
     raise ValueError("GROQ_API_KEY not found in environment variables.")
 
+# Keep-alive client shared by every LLM call; HTTP/2 only if h2 is installed.
+http_client = httpx.Client(
+    http2=importlib.util.find_spec("h2") is not None,
+    timeout=60,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
 llm = ChatGroq(
     groq_api_key=GROQ_API_KEY,
     temperature=0.3,
     model_name="gemma2-9b-it",
+    http_client=http_client,
 )
 
-def generate_concise_solution(error: str) -> str:
-    prompt = """
+# Identical prompts are answered from a local SQLite cache across runs.
+set_llm_cache(SQLiteCache(database_path=LLM_CACHE_DB))
+
+# Recurring stack traces differ only in line numbers, addresses and whitespace. Only
+# stack-trace markers are stripped: ports, status and error codes (0x80070005) and
+# times stay part of the key; hex is dropped only as an address ("object at 0x7f3a...").
+_VOLATILE_RE = re.compile(
+    r"\bline \d+\b|(?<=\.py):\d+\b|(?<=\.java):\d+(?=\))|(?<=\bat )0x[0-9a-f]+", re.IGNORECASE
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+def _normalize(text: str) -> str:
+    return _WHITESPACE_RE.sub(" ", _VOLATILE_RE.sub("", text)).strip().lower()
+
+def _memoize_normalized(func, maxsize=1024):
+    # In-process LRU keyed on a digest of the normalized arguments (the CSV test case text
+    # passed to analyze_test_cases can be long); the LLM still sees the originals.
+    cache = OrderedDict()
+    lock = threading.Lock()
+
+    @functools.wraps(func)
+    def wrapper(*args):
+        # \x1f is whitespace to _normalize, so it cannot appear inside a normalized argument.
+        key = hashlib.blake2b("\x1f".join(map(_normalize, args)).encode(), digest_size=16).digest()
+        with lock:
+            if key in cache:
+                cache.move_to_end(key)
+                return cache[key]
+        result = func(*args)
+        with lock:
+            cache[key] = result
+            if len(cache) > maxsize:
+                cache.popitem(last=False)
+        return result
+    return wrapper
+
+# Prompt templates are parsed once at import rather than on every call.
+CONCISE_SOLUTION_TEMPLATE = ChatPromptTemplate.from_template("""
     [INST] Provide a concise, one-sentence solution for the following error:
     Error: {error}
     [/INST]
-    """
-    prompt_template = ChatPromptTemplate.from_template(prompt)
-    formatted_prompt = prompt_template.format_prompt(error=error)
-    solution = llm.invoke(formatted_prompt.to_messages()).content.strip()
-    return solution
+    """)
 
-def generate_explanation(error: str, solution: str) -> str:
-    prompt = """
+EXPLANATION_TEMPLATE = ChatPromptTemplate.from_template("""
     [INST] Provide a brief explanation of why the above solution fixes the error:
     Error: {error}
     Solution: {solution}
     [/INST]
-    """
-    template = ChatPromptTemplate.from_template(prompt)
-    formatted = template.format_prompt(error=error, solution=solution)
-    explanation = llm.invoke(formatted.to_messages()).content.strip()
-    return explanation
+    """)
 
-def analyze_test_cases(solution: str, test_cases_text: str) -> str:
-    prompt = """
-    [INST] Given the following solution:
-    Solution: {solution}
-    and the following test cases:
-    {test_cases}
-    Do these test cases fully validate the solution end-to-end? If not, generate additional test cases that cover all missing scenarios.
-    Each additional test case MUST include:
+# Instructions and the module's test cases come first and the solution last, so requests
+# for the same module share the longest possible prompt prefix (provider prefix caching).
+ANALYZE_TEST_CASES_TEMPLATE = ChatPromptTemplate.from_template("""
+    [INST] Each additional test case you generate MUST include:
       Test_Scenario: A short description of the scenario.
       Test_Steps: Step-by-step instructions.
       Pre_Requisite: Conditions before running the test.
       Expected_Result: What should happen.
       Pass_Fail_Criteria: How to determine if the test passes.
     End each additional test case with the delimiter "### END TEST CASE ###".
+    Given the following test cases:
+    {test_cases}
+    and the following solution:
+    Solution: {solution}
+    Do these test cases fully validate the solution end-to-end? If not, generate additional test cases that cover all missing scenarios.
     [/INST]
-    """
-    template = ChatPromptTemplate.from_template(prompt)
-    formatted = template.format_prompt(solution=solution, test_cases=test_cases_text)
-    response = llm.invoke(formatted.to_messages()).content.strip()
-    return response
+    """)
 
-def generate_comprehensive_test_cases(error: str, solution: str, explanation: str) -> str:
-    prompt = """
+COMPREHENSIVE_TEST_CASES_TEMPLATE = ChatPromptTemplate.from_template("""
     [INST] Generate a comprehensive set of test cases that fully validate the following concise solution end-to-end.
     Error: {error}
     Solution: {solution}
-    Explanation: {explanation}
     Ensure the test cases cover all possible scenarios, including success and failure.
     Each test case MUST include:
       Test_Scenario: A short description of the scenario.
@@ -72,23 +111,15 @@ def generate_comprehensive_test_cases(error: str, solution: str, explanation: st
       Pass_Fail_Criteria: How to determine if the test passes.
     End each test case with the delimiter "### END TEST CASE ###".
     [/INST]
-    """
-    template = ChatPromptTemplate.from_template(prompt)
-    formatted = template.format_prompt(error=error, solution=solution, explanation=explanation)
-    test_cases_response = llm.invoke(formatted.to_messages()).content.strip()
-    return test_cases_response
+    """)
 
-def generate_alternative_solution(error: str) -> str:
-    prompt = """
+ALTERNATIVE_SOLUTION_TEMPLATE = ChatPromptTemplate.from_template("""
     [INST] Provide a concise, one-sentence alternative solution for the following error:
     Error: {error}
     [/INST]
-    """
-    template = ChatPromptTemplate.from_template(prompt)
-    formatted = template.format_prompt(error=error)
-    alt_solution = llm.invoke(formatted.to_messages()).content.strip()
-    
-    test_case_prompt = """
+    """)
+
+ALTERNATIVE_TEST_CASES_TEMPLATE = ChatPromptTemplate.from_template("""
     [INST] Given the error and the alternative solution:
     Error: {error}
     Solution: {solution}
@@ -101,9 +132,37 @@ def generate_alternative_solution(error: str) -> str:
       Pass_Fail_Criteria: How to determine if the test passes.
     End each test case with the delimiter "### END TEST CASE ###".
     [/INST]
-    """
-    tc_template = ChatPromptTemplate.from_template(test_case_prompt)
-    formatted_tc = tc_template.format_prompt(error=error, solution=alt_solution)
+    """)
+
+@_memoize_normalized
+def generate_concise_solution(error: str) -> str:
+    formatted_prompt = CONCISE_SOLUTION_TEMPLATE.format_prompt(error=error)
+    solution = llm.invoke(formatted_prompt.to_messages()).content.strip()
+    return solution
+
+@_memoize_normalized
+def generate_explanation(error: str, solution: str) -> str:
+    formatted = EXPLANATION_TEMPLATE.format_prompt(error=error, solution=solution)
+    explanation = llm.invoke(formatted.to_messages()).content.strip()
+    return explanation
+
+@_memoize_normalized
+def analyze_test_cases(solution: str, test_cases_text: str) -> str:
+    formatted = ANALYZE_TEST_CASES_TEMPLATE.format_prompt(solution=solution, test_cases=test_cases_text)
+    response = llm.invoke(formatted.to_messages()).content.strip()
+    return response
+
+@_memoize_normalized
+def generate_comprehensive_test_cases(error: str, solution: str) -> str:
+    formatted = COMPREHENSIVE_TEST_CASES_TEMPLATE.format_prompt(error=error, solution=solution)
+    test_cases_response = llm.invoke(formatted.to_messages()).content.strip()
+    return test_cases_response
+
+def generate_alternative_solution(error: str) -> str:
+    formatted = ALTERNATIVE_SOLUTION_TEMPLATE.format_prompt(error=error)
+    alt_solution = llm.invoke(formatted.to_messages()).content.strip()
+
+    formatted_tc = ALTERNATIVE_TEST_CASES_TEMPLATE.format_prompt(error=error, solution=alt_solution)
     alt_test_cases = llm.invoke(formatted_tc.to_messages()).content.strip()
     alt_response = (
         "<h2>Alternative Solution (Generated):</h2><p>{AltSolution}</p>"
@@ -0,0 +1,87 @@
+# response_cache.py
+import atexit
+import json
+import os
+import threading
+from collections import OrderedDict
+import faiss
+import numpy as np
+from config import CACHE_DIR
+from utils import save_index_with_sidecar
+
+# Cosine similarity above which two error messages are treated as the same error.
+SEMANTIC_CACHE_THRESHOLD = 0.92
+# Beyond this many entries the least recently written ones are evicted.
+SEMANTIC_CACHE_MAX_ENTRIES = 5000
+
+class SemanticResponseCache:
+    """JSON-serializable entries keyed by error-message embedding, so near-duplicate errors
+    (different paths, timestamps, addresses) skip the LLM calls entirely. Callers decide
+    whether a hit is still valid; a later add for the same error replaces the entry."""
+
+    def __init__(self, embeddings, cache_dir=CACHE_DIR, threshold=SEMANTIC_CACHE_THRESHOLD,
+                 max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.index_path = os.path.join(cache_dir, "responses.faiss")
+        self.entries_path = os.path.join(cache_dir, "responses.json")
+        self.index = None
+        self.entries = OrderedDict()  # FAISS id -> entry, least recently written first
+        self._next_id = 0
+        self._lock = threading.Lock()
+        if os.path.exists(self.index_path) and os.path.exists(self.entries_path):
+            with open(self.entries_path) as f:
+                data = json.load(f)
+            index = faiss.read_index(self.index_path)
+            # Skip files from an older layout or from two different saves.
+            if isinstance(data, dict) and index.ntotal == len(data.get("entries", [])):
+                self.index = index
+                self.entries = OrderedDict((int(entry_id), entry) for entry_id, entry in data["entries"])
+                self._next_id = max(self.entries, default=-1) + 1
+        atexit.register(self.save)
+
+    def _embed(self, text: str):
+        vector = np.asarray([self.embeddings.embed_query(text)], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _nearest(self, vector):
+        if self.index is None or self.index.ntotal == 0:
+            return None
+        scores, ids = self.index.search(vector, 1)
+        if ids[0, 0] != -1 and scores[0, 0] >= self.threshold:
+            return int(ids[0, 0])
+        return None
+
+    def lookup(self, error_message: str):
+        vector = self._embed(error_message)
+        with self._lock:
+            entry_id = self._nearest(vector)
+            return None if entry_id is None else self.entries[entry_id]
+
+    def add(self, error_message: str, entry: dict):
+        vector = self._embed(error_message)
+        with self._lock:
+            entry_id = self._nearest(vector)
+            if entry_id is not None:
+                # The same error is already cached (its entry was stale); replace it in place.
+                self.entries[entry_id] = entry
+                self.entries.move_to_end(entry_id)
+                return
+            if self.index is None:
+                self.index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+            self.index.add_with_ids(vector, np.array([self._next_id], dtype=np.int64))
+            self.entries[self._next_id] = entry
+            self._next_id += 1
+            if len(self.entries) > self.max_entries:
+                oldest, _ = self.entries.popitem(last=False)
+                self.index.remove_ids(np.array([oldest], dtype=np.int64))
+
+    def save(self):
+        with self._lock:
+            if self.index is None:
+                return
+            save_index_with_sidecar(
+                self.index, self.index_path, {"entries": list(self.entries.items())}, self.entries_path
+            )
@@ -1,66 +1,154 @@
 # test_case_manager.py
-import pandas as pd
+import csv
+import os
 import re
+from collections import defaultdict
 
-def get_csv_test_cases(test_cases_df, module: str):
-    test_cases = []
-    if test_cases_df.empty:
-        return test_cases
-    df_filtered = test_cases_df[test_cases_df["Module"] == module]
-    for _, row in df_filtered.iterrows():
-        tc_text = " ".join([
-            str(row.get("Test_Scenario", "")),
-            str(row.get("Test_Steps", "")),
-            str(row.get("Pre_Requisite", "")),
-            str(row.get("Expected_Result", "")),
-            str(row.get("Pass_Fail_Criteria", ""))
-        ])
-        if tc_text.strip() == "":
-            continue
-        tc_dict = {
-            "Module": row["Module"],
-            "Test_Scenario": row["Test_Scenario"],
-            "Test_Steps": row["Test_Steps"],
-            "Pre_Requisite": row["Pre_Requisite"],
-            "Pass_Fail_Criteria": row["Pass_Fail_Criteria"],
-            "Expected_Result": row["Expected_Result"]
+TEST_CASE_COLUMNS = ["Module", "Test_Scenario", "Test_Steps", "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"]
+
+_NO_TEST_CASES = {"cases": [], "plain": "", "html": ""}
+
+# Parsed test case CSVs keyed by path; reused until the file's mtime changes. Each entry
+# holds the rows as dicts, their keys (to skip duplicates when appending) and a per-module
+# index of the cases, pre-rendered as plain text (for LLM prompts) and HTML (for the response).
+_CSV_CACHE = {}
+
+def _row_key(row: dict) -> tuple:
+    return tuple(row[col] for col in TEST_CASE_COLUMNS)
+
+def _module_entry(cases: list) -> dict:
+    return {"cases": cases, "plain": format_test_cases_plain(cases), "html": format_test_cases_html(cases)}
+
+def _group_by_module(rows: list) -> dict:
+    grouped = defaultdict(list)
+    for row in rows:
+        grouped[row["Module"]].append(row)
+    return grouped
+
+def _index_by_module(rows: list) -> dict:
+    # Skip rows whose test case fields are all blank.
+    rows = [row for row in rows if any(row[col].strip() for col in TEST_CASE_COLUMNS[1:])]
+    return {module: _module_entry(cases) for module, cases in _group_by_module(rows).items()}
+
+def _read_rows(file_path: str) -> list:
+    # utf-8-sig strips the BOM Excel writes, which would otherwise end up in the first header.
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        return [{col: row.get(col) or "" for col in TEST_CASE_COLUMNS} for row in csv.DictReader(f)]
+
+def _read_header(file_path: str) -> list:
+    with open(file_path, newline="", encoding="utf-8-sig") as f:
+        return next(csv.reader(f), [])
+
+def _load(file_path: str):
+    try:
+        mtime = os.stat(file_path).st_mtime_ns
+    except OSError:
+        return None
+    cached = _CSV_CACHE.get(file_path)
+    if cached is None or cached["mtime"] != mtime:
+        try:
+            rows = _read_rows(file_path)
+        except Exception:
+            rows = []
+        cached = _CSV_CACHE[file_path] = {
+            "mtime": mtime, "rows": rows, "keys": set(map(_row_key, rows)), "by_module": _index_by_module(rows)
         }
-        test_cases.append(tc_dict)
-    return test_cases
+    return cached
+
+def load_test_cases(file_path="test_cases.csv") -> list:
+    cached = _load(file_path)
+    return cached["rows"] if cached else []
+
+def get_module_test_cases(module: str, file_path="test_cases.csv") -> dict:
+    cached = _load(file_path)
+    return cached["by_module"].get(module, _NO_TEST_CASES) if cached else _NO_TEST_CASES
+
+TEST_CASE_FIELDS = ["Test_Scenario", "Test_Steps", "Pre_Requisite", "Expected_Result", "Pass_Fail_Criteria"]
+_LABELS = "|".join(TEST_CASE_FIELDS)
+# One pass over the text: each label's value runs up to the next label or the end.
+_FIELD_RE = re.compile(rf"({_LABELS}):\s*(.*?)\s*(?=(?:{_LABELS}):|\Z)", re.DOTALL)
 
 def parse_test_case(tc_text: str) -> dict:
-    fields = {
-        "Test_Scenario": "",
-        "Test_Steps": "",
-        "Pre_Requisite": "",
-        "Expected_Result": "",
-        "Pass_Fail_Criteria": ""
-    }
-    for field in fields.keys():
-        pattern = field + r":\s*(.*?)\s*(?=(Test_Steps:|Pre_Requisite:|Expected_Result:|Pass_Fail_Criteria:|$))"
-        match = re.search(pattern, tc_text, re.DOTALL)
-        if match:
-            fields[field] = match.group(1).strip()
+    fields = dict.fromkeys(TEST_CASE_FIELDS, "")
+    for match in _FIELD_RE.finditer(tc_text):
+        label, value = match.groups()
+        if not fields[label]:
+            fields[label] = value.strip()
     return fields
 
-def save_new_test_cases(test_cases_df, new_cases: list, file_path="test_cases.csv"):
-    required_columns = ["Module", "Test_Scenario", "Test_Steps", "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"]
-    if test_cases_df.empty:
-        test_cases_df = pd.DataFrame(columns=required_columns)
-    rows_to_add = []
+# Bare marker: responses are stripped, so the last one has no trailing newline.
+TEST_CASE_DELIMITER = "### END TEST CASE ###"
+
+def parse_test_cases(response: str, module: str = None) -> list:
+    cases = []
+    for tc_raw in response.split(TEST_CASE_DELIMITER):
+        tc_raw = tc_raw.strip()
+        if tc_raw:
+            parsed = parse_test_case(tc_raw)
+            if parsed["Test_Scenario"]:
+                cases.append({"Module": module or "Generated", **parsed})
+    return cases
+
+# Bound format_map methods, built once; joined over map() so str.join sizes the output in one pass.
+_TC_PLAIN = (
+    "Test_Scenario: {Test_Scenario}\n"
+    "Test_Steps: {Test_Steps}\n"
+    "Pre_Requisite: {Pre_Requisite}\n"
+    "Expected_Result: {Expected_Result}\n"
+    "Pass_Fail_Criteria: {Pass_Fail_Criteria}"
+).format_map
+_TC_HTML = (
+    "<p><strong>Test_Scenario:</strong> {Test_Scenario}<br>"
+    "<strong>Test_Steps:</strong> {Test_Steps}<br>"
+    "<strong>Pre_Requisite:</strong> {Pre_Requisite}<br>"
+    "<strong>Expected_Result:</strong> {Expected_Result}<br>"
+    "<strong>Pass_Fail_Criteria:</strong> {Pass_Fail_Criteria}</p>"
+).format_map
+
+def format_test_cases_plain(test_cases: list) -> str:
+    return "\n\n".join(map(_TC_PLAIN, test_cases))
+
+def format_test_cases_html(test_cases: list) -> str:
+    return "\n".join(map(_TC_HTML, test_cases))
+
+def save_new_test_cases(test_cases: list, new_cases: list, file_path="test_cases.csv") -> list:
+    # _load re-reads the file if it was edited on disk since it was cached, so the append
+    # and the refreshed cache below never build on a stale view.
+    cached = _load(file_path)
+    if cached is not None:
+        test_cases = cached["rows"]
+    existing_keys = cached["keys"] if cached else set(map(_row_key, test_cases))
+    new_rows, new_keys = [], set()
     for case in new_cases:
-        duplicate = test_cases_df[
-            (test_cases_df["Module"] == case["Module"]) &
-            (test_cases_df["Test_Scenario"] == case["Test_Scenario"]) &
-            (test_cases_df["Test_Steps"] == case["Test_Steps"]) &
-            (test_cases_df["Pre_Requisite"] == case["Pre_Requisite"]) &
-            (test_cases_df["Pass_Fail_Criteria"] == case["Pass_Fail_Criteria"]) &
-            (test_cases_df["Expected_Result"] == case["Expected_Result"])
-        ]
-        if duplicate.empty:
-            rows_to_add.append(case)
-    if rows_to_add:
-        new_df = pd.DataFrame(rows_to_add)
-        test_cases_df = pd.concat([test_cases_df, new_df], ignore_index=True)
-        test_cases_df.to_csv(file_path, index=False)
-    return test_cases_df
+        row = {col: case.get(col) or "" for col in TEST_CASE_COLUMNS}
+        key = _row_key(row)
+        if key not in existing_keys and key not in new_keys:
+            new_keys.add(key)
+            new_rows.append(row)
+    if not new_rows:
+        return test_cases
+    # Append only the new rows, in the file's own column order; write the header when the
+    # file is new or empty.
+    write_header = not os.path.exists(file_path) or os.path.getsize(file_path) == 0
+    fieldnames = TEST_CASE_COLUMNS if write_header else _read_header(file_path)
+    with open(file_path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(
+            f, fieldnames=fieldnames, restval="", extrasaction="ignore", lineterminator="\n"
+        )
+        if write_header:
+            writer.writeheader()
+        writer.writerows(new_rows)
+    test_cases = test_cases + new_rows
+    # Keep the load cache in step with the append so the next request doesn't re-read.
+    if cached is None:
+        by_module = _index_by_module(test_cases)
+        keys = set(map(_row_key, test_cases))
+    else:
+        by_module = dict(cached["by_module"])
+        for module, rows in _group_by_module(new_rows).items():
+            by_module[module] = _module_entry(by_module.get(module, _NO_TEST_CASES)["cases"] + rows)
+        keys = existing_keys | new_keys
+    _CSV_CACHE[file_path] = {
+        "mtime": os.stat(file_path).st_mtime_ns, "rows": test_cases, "keys": keys, "by_module": by_module
+    }
+    return test_cases
@@ -1,5 +1,18 @@
 # utils.py
+import json
+import os
 from difflib import SequenceMatcher
+import faiss
 
 def similarity(a: str, b: str) -> float:
     return SequenceMatcher(None, a, b).ratio()
+
+def save_index_with_sidecar(index, index_path: str, sidecar: dict, sidecar_path: str):
+    # Both files go to temp paths first and are swapped in with os.replace, so a crash never
+    # leaves a half-written file. Loaders still check that the pair came from the same save.
+    os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+    faiss.write_index(index, index_path + ".tmp")
+    with open(sidecar_path + ".tmp", "w") as f:
+        json.dump(sidecar, f)
+    os.replace(index_path + ".tmp", index_path)
+    os.replace(sidecar_path + ".tmp", sidecar_path)
@@ -6,6 +6,7 @@ from langgraph.graph import END, StateGraph
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_community.embeddings import HuggingFaceEmbeddings
 # from langchain_groq import ChatGroq
 from langchain.chat_models import AzureChatOpenAI
@@ -37,19 +38,6 @@ llm = AzureChatOpenAI(
     temperature=0.3
 )
 
-# defining a similarity function
-def cosine_similarity(vec1: np.ndarray, vec2:np.ndarray)->float:
-  return float(np.dot(vec1, vec2)/(np.linalg.norm(vec1))*(np.linalg.norm(vec2)))
-
-def get_embedding(text:str) -> np.ndarray:
-  return np.array(embeddings.embed_query(text))
-
-def is_similar(query:str, document: Document, threshold:float = 0.5)->bool:
-  query_emb = get_embedding(query)
-  doc_emb = get_embedding(document.page_content)
-  sim = cosine_similarity(query_emb, doc_emb)
-  return sim >= threshold
-
 # Data Loading and Document Preparation
 df = pd.read_csv("/content/defects.csv")
 
@@ -70,10 +58,13 @@ for _, row in df.iterrows():
             }
         ))
 
-# Create embeddings and FAISS vector store for retrieval
-embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-vector_store = FAISS.from_documents(docs, embeddings)
-retriever = vector_store.as_retriever(search_kwargs={"k": 1})
+# Create embeddings and FAISS vector store for retrieval.
+# Embeddings are L2-normalized and searched by inner product, so FAISS scores are cosine similarities.
+embeddings = HuggingFaceEmbeddings(
+    model_name="sentence-transformers/all-MiniLM-L6-v2",
+    encode_kwargs={"normalize_embeddings": True}
+)
+vector_store = FAISS.from_documents(docs, embeddings, distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT)
 
 # Helper: Retrieve CSV Test Cases by Module (only return proper ones)
 def get_csv_test_cases(module: str) -> List[dict]:
@@ -151,8 +142,17 @@ def save_new_test_cases(new_cases: List[dict]):
 class AgentState(TypedDict):
     input: str
     context: List[Document]
+    score: float
     response: str
 
+# Workflow Node: Retrieve the closest defect together with its cosine similarity score
+def retrieve(state: AgentState):
+    docs_and_scores = vector_store.similarity_search_with_score(state["input"], k=1)
+    if not docs_and_scores:
+        return {"context": [], "score": 0.0}
+    doc, score = docs_and_scores[0]
+    return {"context": [doc], "score": float(score)}
+
 # Workflow Node: Validate or Generate Test Cases (with CSV storage and supplementing missing cases)
 def validate_or_generate_test_cases(state: AgentState):
     try:
@@ -162,7 +162,7 @@ def validate_or_generate_test_cases(state: AgentState):
         error_message = state["input"]
 
         # Ensure the defect is similar to the error message
-        if not is_similar(error_message, context, threshold = 0.6):
+        if state["score"] < 0.6:
           return {"response":"**Error**: The defect could not be found in the database."}
 
         # if similarity(error_message.lower(), context.page_content.lower()) <= 0.5:
@@ -329,7 +329,7 @@ def send_email(final_solution: str):
 
 # Build the State Graph Workflow
 workflow = StateGraph(AgentState)
-workflow.add_node("retrieve", lambda state: {"context": retriever.invoke(state["input"])})
+workflow.add_node("retrieve", retrieve)
 workflow.add_node("validate_or_generate_test_cases", validate_or_generate_test_cases)
 workflow.set_entry_point("retrieve")
 workflow.add_edge("retrieve", "validate_or_generate_test_cases")
@@ -1,143 +1,152 @@
 # workflow.py
-import re
-import pandas as pd
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, TypedDict
+from langchain_core.documents import Document
 from langgraph.graph import END, StateGraph
 from llm_client import (
     generate_concise_solution, generate_explanation,
     analyze_test_cases, generate_comprehensive_test_cases
 )
-from test_case_manager import get_csv_test_cases, parse_test_case, save_new_test_cases
-from utils import similarity
+from test_case_manager import (
+    load_test_cases, get_module_test_cases, parse_test_cases, save_new_test_cases,
+    format_test_cases_html
+)
+from response_cache import SemanticResponseCache
+from data_loader import defects_fingerprint
 from config import TEST_CASES_CSV
 
+# Cosine similarity (normalized embeddings, inner-product index) above which the
+# retrieved defect is treated as the same error.
+RETRIEVAL_SCORE_THRESHOLD = 0.6
+
+# LLM calls are network-bound; the explanation runs here while test cases are generated.
+_llm_executor = ThreadPoolExecutor(max_workers=4)
+
+# Bound format_map method for the final HTML response, built once.
+_RESPONSE = (
+    "<h2>Error:</h2><p>{Error}</p>"
+    "<h2>Solution:</h2><p>{Solution}</p>"
+    "<h2>Explanation:</h2><p>{Explanation}</p>"
+    "<h2>{Header}</h2>{TestCases}"
+).format_map
+
+class AgentState(TypedDict, total=False):
+    input: str
+    context: List[Document]
+    scores: List[float]
+    test_cases: List[dict]
+    module: str
+    response_parts: dict
+    response: str
+
+def render_response(error_message: str, parts: dict) -> str:
+    return _RESPONSE({"Error": error_message, **parts})
+
 def validate_or_generate_test_cases(state: dict) -> dict:
     try:
         error_message = state["input"]
         solution = None
         module = None
+        explanation = None
 
-        # Retrieve defect context if available.
-        if state.get("context") and len(state["context"]) > 0:
+        # Retrieve defect context if available; relevance comes from the vector search score.
+        if state.get("context") and state.get("scores"):
             context = state["context"][0]
-            if similarity(error_message.lower(), context.page_content.lower()) >= 0.6:
+            if state["scores"][0] >= RETRIEVAL_SCORE_THRESHOLD:
                 solution = context.metadata["solution"]
                 module = context.metadata["module"]
+                explanation = context.metadata.get("explanation")
 
-        # Load CSV test cases.
-        try:
-            test_cases_df = pd.read_csv(TEST_CASES_CSV)
-        except Exception:
-            test_cases_df = pd.DataFrame(columns=[
-                "Module", "Test_Scenario", "Test_Steps", 
-                "Pre_Requisite", "Pass_Fail_Criteria", "Expected_Result"
-            ])
-        csv_test_cases = get_csv_test_cases(test_cases_df, module) if module else []
+        # CSV test cases are loaded alongside retrieval (cached until the file changes; indexed by module).
+        test_cases = state.get("test_cases")
+        if test_cases is None:
+            test_cases = load_test_cases(TEST_CASES_CSV)
+        module_test_cases = get_module_test_cases(module, TEST_CASES_CSV) if module else {}
+        csv_test_cases = module_test_cases.get("cases", [])
 
         # Generate a concise solution if none is found.
         if not solution:
             solution = generate_concise_solution(error_message)
-            explanation = generate_explanation(error_message, solution)
-        else:
-            explanation = generate_explanation(error_message, solution)
+        # Test case generation doesn't depend on the explanation, so the two calls overlap.
+        # Defects with a stored explanation skip the call entirely.
+        explanation_future = None if explanation else _llm_executor.submit(generate_explanation, error_message, solution)
 
         if csv_test_cases:
-            # Format CSV test cases for LLM analysis.
-            def format_tc_plain(tc: dict) -> str:
-                return (f"Test_Scenario: {tc['Test_Scenario']}\n"
-                        f"Test_Steps: {tc['Test_Steps']}\n"
-                        f"Pre_Requisite: {tc['Pre_Requisite']}\n"
-                        f"Expected_Result: {tc['Expected_Result']}\n"
-                        f"Pass_Fail_Criteria: {tc['Pass_Fail_Criteria']}")
-            csv_tc_text = "\n\n".join(format_tc_plain(tc) for tc in csv_test_cases)
-
-            # Analyze and generate additional test cases if needed.
-            analysis_response = analyze_test_cases(solution, csv_tc_text)
-            delimiter = "\n### END TEST CASE ###\n"
-            additional_tc_raw = [tc.strip() for tc in re.split(delimiter, analysis_response) if tc.strip()]
-            extra_generated_cases = []
-            for tc_raw in additional_tc_raw:
-                parsed = parse_test_case(tc_raw)
-                if parsed["Test_Scenario"]:
-                    extra_generated_cases.append({
-                        "Module": module if module else "Generated",
-                        "Test_Scenario": parsed["Test_Scenario"],
-                        "Test_Steps": parsed["Test_Steps"],
-                        "Pre_Requisite": parsed["Pre_Requisite"],
-                        "Pass_Fail_Criteria": parsed["Pass_Fail_Criteria"],
-                        "Expected_Result": parsed["Expected_Result"]
-                    })
-            # Combine CSV and additional test cases.
-            all_test_cases = csv_test_cases + extra_generated_cases
-            if extra_generated_cases:
-                test_cases_df = save_new_test_cases(test_cases_df, extra_generated_cases, TEST_CASES_CSV)
-            def format_tc(tc: dict) -> str:
-                return (f"<p><strong>Test_Scenario:</strong> {tc['Test_Scenario']}<br>"
-                        f"<strong>Test_Steps:</strong> {tc['Test_Steps']}<br>"
-                        f"<strong>Pre_Requisite:</strong> {tc['Pre_Requisite']}<br>"
-                        f"<strong>Expected_Result:</strong> {tc['Expected_Result']}<br>"
-                        f"<strong>Pass_Fail_Criteria:</strong> {tc['Pass_Fail_Criteria']}</p>")
-            test_cases_html = "\n".join(format_tc(tc) for tc in all_test_cases)
-            response_template = (
-                "<h2>Error:</h2><p>{Error}</p>"
-                "<h2>Solution:</h2><p>{Solution}</p>"
-                "<h2>Explanation:</h2><p>{Explanation}</p>"
-                "<h2>Test Cases (CSV + Generated):</h2>{TestCases}"
-            )
-            final_response = response_template.format(
-                Error=error_message,
-                Solution=solution,
-                Explanation=explanation,
-                TestCases=test_cases_html
-            )
+            # Analyze and generate additional test cases if needed; CSV cases come pre-formatted.
+            test_cases_response = analyze_test_cases(solution, module_test_cases["plain"])
+            header = "Test Cases (CSV + Generated):"
         else:
             # Generate comprehensive test cases when no CSV cases exist.
-            test_cases_response = generate_comprehensive_test_cases(error_message, solution, explanation)
-            delimiter = "\n### END TEST CASE ###\n"
-            test_cases_raw = [tc.strip() for tc in re.split(delimiter, test_cases_response) if tc.strip()]
-            generated_cases = []
-            for tc_raw in test_cases_raw:
-                parsed = parse_test_case(tc_raw)
-                if parsed["Test_Scenario"]:
-                    generated_cases.append({
-                        "Module": module if module else "Generated",
-                        "Test_Scenario": parsed["Test_Scenario"],
-                        "Test_Steps": parsed["Test_Steps"],
-                        "Pre_Requisite": parsed["Pre_Requisite"],
-                        "Pass_Fail_Criteria": parsed["Pass_Fail_Criteria"],
-                        "Expected_Result": parsed["Expected_Result"]
-                    })
-            if generated_cases:
-                test_cases_df = save_new_test_cases(test_cases_df, generated_cases, TEST_CASES_CSV)
-            def format_tc(tc: dict) -> str:
-                return (f"<p><strong>Test_Scenario:</strong> {tc['Test_Scenario']}<br>"
-                        f"<strong>Test_Steps:</strong> {tc['Test_Steps']}<br>"
-                        f"<strong>Pre_Requisite:</strong> {tc['Pre_Requisite']}<br>"
-                        f"<strong>Expected_Result:</strong> {tc['Expected_Result']}<br>"
-                        f"<strong>Pass_Fail_Criteria:</strong> {tc['Pass_Fail_Criteria']}</p>")
-            test_cases_html = "\n".join(format_tc(tc) for tc in generated_cases)
-            response_template = (
-                "<h2>Error:</h2><p>{Error}</p>"
-                "<h2>Solution:</h2><p>{Solution}</p>"
-                "<h2>Explanation:</h2><p>{Explanation}</p>"
-                "<h2>Test Cases (Generated):</h2>{TestCases}"
-            )
-            final_response = response_template.format(
-                Error=error_message,
-                Solution=solution,
-                Explanation=explanation,
-                TestCases=test_cases_html
-            )
+            test_cases_response = generate_comprehensive_test_cases(error_message, solution)
+            header = "Test Cases (Generated):"
+        generated_cases = parse_test_cases(test_cases_response, module)
+
+        # CSV cases are already rendered; only the generated ones are formatted here.
+        rendered = [module_test_cases["html"]] if csv_test_cases else []
+        if generated_cases:
+            test_cases = save_new_test_cases(test_cases, generated_cases, TEST_CASES_CSV)
+            rendered.append(format_test_cases_html(generated_cases))
+        if explanation_future:
+            explanation = explanation_future.result()
+        response_parts = {
+            "Solution": solution,
+            "Explanation": explanation,
+            "Header": header,
+            "TestCases": "\n".join(rendered)
+        }
+        final_response = render_response(error_message, response_parts)
         state["response"] = final_response
-        return {"response": final_response}
+        return {"response": final_response, "module": module, "response_parts": response_parts}
     except Exception as e:
         state["response"] = f"Error processing request: {e}"
         return {"response": state["response"]}
 
 def build_workflow(retriever):
-    workflow = StateGraph(dict)
-    workflow.add_node("retrieve", lambda state: {"context": retriever.invoke(state["input"])})
-    workflow.add_node("validate_or_generate_test_cases", validate_or_generate_test_cases)
-    workflow.set_entry_point("retrieve")
-    workflow.add_edge("retrieve", "validate_or_generate_test_cases")
+    # Reuses the retriever's embedding model rather than loading a second one.
+    response_cache = SemanticResponseCache(retriever.vectorstore.embeddings)
+    defects_version = defects_fingerprint(retriever.vectorstore)
+
+    def cache_stamp(module) -> str:
+        # A cached response is valid for the defects and module test cases it was built from.
+        module_cases = get_module_test_cases(module, TEST_CASES_CSV)["plain"] if module else ""
+        return hashlib.blake2b(f"{defects_version}\x1f{module_cases}".encode(), digest_size=16).hexdigest()
+
+    def check_response_cache(state: AgentState) -> dict:
+        cached = response_cache.lookup(state["input"])
+        if cached is None or cached["stamp"] != cache_stamp(cached["module"]):
+            return {}
+        # Re-rendered so the Error section shows this request's error, not the cached one's.
+        return {"response": render_response(state["input"], cached["parts"])}
+
+    def retrieve(state: AgentState) -> dict:
+        # Keep the scores the search already computed instead of re-comparing text.
+        docs_and_scores = retriever.vectorstore.similarity_search_with_score(
+            state["input"], k=retriever.search_kwargs.get("k", 4)
+        )
+        return {"context": [doc for doc, _ in docs_and_scores], "scores": [score for _, score in docs_and_scores]}
+
+    def generate_and_cache(state: AgentState) -> dict:
+        result = validate_or_generate_test_cases(state)
+        if "response_parts" in result:
+            # Stamped after validate has saved any generated test cases to the CSV.
+            module = result["module"]
+            response_cache.add(
+                state["input"], {"module": module, "stamp": cache_stamp(module), "parts": result["response_parts"]}
+            )
+        return result
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("check_response_cache", check_response_cache)
+    workflow.add_node("retrieve", retrieve)
+    workflow.add_node("load_test_cases", lambda state: {"test_cases": load_test_cases(TEST_CASES_CSV)})
+    workflow.add_node("validate_or_generate_test_cases", generate_and_cache)
+    workflow.set_entry_point("check_response_cache")
+    # On a cache miss, the vector search and the CSV load run in parallel in the same step.
+    workflow.add_conditional_edges(
+        "check_response_cache",
+        lambda state: END if state.get("response") else ["retrieve", "load_test_cases"]
+    )
+    workflow.add_edge(["retrieve", "load_test_cases"], "validate_or_generate_test_cases")
     workflow.add_edge("validate_or_generate_test_cases", END)
     return workflow.compile()